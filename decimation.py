@@ -0,0 +1,198 @@
+import math
+import numpy as np
+
+
+class GrowableArray:
+
+    def __init__(self, dtype=float, capacity=1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype).ravel()
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            data = np.empty(max(needed, 2*len(self.data)), dtype=self.data.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class PyramidLevel:
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.complete_buckets = 0
+        self.indices = GrowableArray(dtype=np.int64)
+
+
+class TracePyramid:
+    # Multi-resolution min/max pyramid of a uniformly sampled trace.
+    # Level k keeps the min and max sample of every bucket of
+    # min_bucket*factor**k samples, so the envelope survives decimation.
+    # With switching=True the samples on both sides of an on/off transition
+    # (value becoming zero or non zero) are kept at every level, at most one
+    # transition per column of the window, so compressor, damper and door
+    # edges are drawn exactly while the point count stays proportional to
+    # the budget.
+    # Samples can be appended, only the new complete buckets are reduced.
+
+    def __init__(self, values=None, x0=0, dx=1, factor=4, min_bucket=4, switching=False):
+        self.x0 = x0
+        self.dx = dx
+        self.factor = factor
+        self.min_bucket = min_bucket
+        self.switching = switching
+
+        self.values = GrowableArray()
+        self.edges = GrowableArray(dtype=np.int64)
+        self.levels = []
+
+        if values is not None:
+            self.append(values)
+
+    def __len__(self):
+        return self.values.size
+
+    def x_first(self):
+        return self.x0
+
+    def x_last(self):
+        return self.x0 + (len(self) - 1)*self.dx
+
+    def append(self, values):
+        start = len(self)
+        self.values.extend(values)
+        self.update_edges(start)
+        self.update_levels()
+
+    def update_edges(self, start):
+        if not self.switching:
+            return
+        values = self.values.view()
+        first = max(start, 1)
+        if first >= len(values):
+            return
+        state = values[first - 1:] != 0
+        changes = np.flatnonzero(state[1:] != state[:-1]) + first
+        self.edges.extend(np.stack([changes - 1, changes], axis=1))
+
+    def update_levels(self):
+        size = len(self)
+        bucket = self.min_bucket*self.factor**len(self.levels)
+        while bucket <= size:
+            self.levels.append(PyramidLevel(bucket))
+            bucket *= self.factor
+
+        values = self.values.view()
+        for level in self.levels:
+            complete_buckets = size//level.bucket
+            if complete_buckets == level.complete_buckets:
+                continue
+            start = level.complete_buckets*level.bucket
+            end = complete_buckets*level.bucket
+            segment = values[start:end].reshape(-1, level.bucket)
+            offsets = start + np.arange(segment.shape[0])*level.bucket
+            extremes = np.stack([segment.argmin(axis=1), segment.argmax(axis=1)], axis=1)
+            extremes = np.sort(extremes, axis=1) + offsets[:, None]
+            level.indices.extend(extremes)
+            level.complete_buckets = complete_buckets
+
+    def select_level(self, span, max_points):
+        # Finest level whose point count over the span fits the budget
+        if span <= max_points or not self.levels:
+            return None
+        for level in self.levels:
+            if 2*span/level.bucket <= max_points:
+                return level
+        return self.levels[-1]
+
+    def window_edges(self, i0, i1, max_points):
+        # Only the first edge of each column of span/max_points samples is kept
+        # exactly, the others are covered by the min/max of their bucket
+        changes = self.edges.view()[1::2]
+        lo, hi = np.searchsorted(changes, [i0 + 1, i1])
+        changes = changes[lo:hi]
+        columns = (changes - i0)*max_points//(i1 - i0)
+        changes = changes[np.unique(columns, return_index=True)[1]]
+        return np.stack([changes - 1, changes], axis=1).ravel()
+
+    def window(self, x_min, x_max, max_points):
+        size = len(self)
+        if size == 0:
+            return np.empty(0), np.empty(0)
+
+        # One extra sample on each side so the line reaches the window edges
+        i0 = min(max(math.floor((x_min - self.x0)/self.dx) - 1, 0), size - 1)
+        i1 = max(min(math.ceil((x_max - self.x0)/self.dx) + 2, size), i0 + 1)
+
+        level = self.select_level(i1 - i0, max_points)
+        if level is None:
+            indices = np.arange(i0, i1)
+        else:
+            level_indices = level.indices.view()
+            lo, hi = np.searchsorted(level_indices, [i0, i1])
+            tail_start = max(level.complete_buckets*level.bucket, i0)
+            parts = [level_indices[lo:hi], np.arange(tail_start, i1), [i0, i1 - 1]]
+            if self.switching:
+                parts.append(self.window_edges(i0, i1, max_points))
+            indices = np.unique(np.concatenate(parts).astype(np.int64))
+
+        return self.x0 + indices*self.dx, self.values.view()[indices]
+
+
+class LodPlot:
+    # Draws TracePyramids on an Axes and re-selects the level of every
+    # trace from the visible x range on each zoom or pan.
+    # The budget defaults to two points per horizontal pixel of the axes.
+
+    def __init__(self, ax, max_points=None):
+        self.ax = ax
+        self.max_points = max_points
+        self.traces = []
+        self.callback_id = ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+    def points_budget(self):
+        if self.max_points is not None:
+            return self.max_points
+        return max(2*int(self.ax.bbox.width), 100)
+
+    def plot(self, values, x0=0, dx=1, switching=False, **kwargs):
+        if isinstance(values, TracePyramid):
+            pyramid = values
+        else:
+            pyramid = TracePyramid(values, x0=x0, dx=dx, switching=switching)
+        line, = self.ax.plot(*pyramid.window(pyramid.x_first(), pyramid.x_last(), self.points_budget()), **kwargs)
+        self.traces.append((pyramid, line))
+        return pyramid
+
+    def extent(self):
+        traces = [pyramid for pyramid, line in self.traces if len(pyramid) > 0]
+        if not traces:
+            return None
+        return min(p.x_first() for p in traces), max(p.x_last() for p in traces)
+
+    def refresh(self):
+        x_min, x_max = self.ax.get_xlim()
+        budget = self.points_budget()
+        for pyramid, line in self.traces:
+            line.set_data(*pyramid.window(x_min, x_max, budget))
+
+    def follow(self):
+        # Show the whole trace, used while the view tracks the newest samples
+        extent = self.extent()
+        if extent is None:
+            return
+        x_min, x_max = extent
+        if x_max <= x_min:
+            x_max = x_min + 1
+        self.ax.set_xlim(x_min, x_max)
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+
+    def on_xlim_changed(self, ax):
+        self.refresh()
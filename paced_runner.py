@@ -0,0 +1,308 @@
+import argparse
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from refrigeration_system import RefrigerationSystem, SYSTEM_CONFIGS, SECONDS_PER_MINUTE
+
+OVERRUN_POLICIES = ["CATCH_UP", "SKIP"]
+
+# Inputs the external I/O side may write between physics steps
+INPUT_KEYS = ["ambient", "cabinet_1_door_is_open", "cabinet_2_door_is_open", "voltage_fault_state"]
+
+
+class StateExchange:
+    # Double buffer guarded by a sequence counter: the physics side always
+    # writes the back buffer and flips, readers copy the front buffer and retry
+    # if a flip happened meanwhile, so the writer never blocks on a reader.
+
+    def __init__(self):
+        self.buffers = [{}, {}]
+        self.front = 0
+        self.sequence = 0
+
+    def publish(self, state):
+        back = self.buffers[1 - self.front]
+        back.clear()
+        back.update(state)
+        self.front = 1 - self.front
+        self.sequence += 1
+
+    def read(self):
+        while True:
+            sequence = self.sequence
+            snapshot = dict(self.buffers[self.front])
+            if sequence == self.sequence:
+                return snapshot
+
+
+class PacingStats:
+
+    def __init__(self):
+        self.steps = 0
+        self.missed_deadlines = 0
+        self.skipped_steps = 0
+        self.resyncs = 0
+        self.latency_min_s = math.inf
+        self.latency_max_s = 0
+        self.latency_mean_s = 0
+        self.latency_m2 = 0
+        self.step_duration_max_s = 0
+        self.step_duration_mean_s = 0
+
+    def record(self, latency_s, step_duration_s):
+        # Welford update, so jitter is available without storing samples
+        self.steps += 1
+        delta = latency_s - self.latency_mean_s
+        self.latency_mean_s += delta/self.steps
+        self.latency_m2 += delta*(latency_s - self.latency_mean_s)
+        self.latency_min_s = min(self.latency_min_s, latency_s)
+        self.latency_max_s = max(self.latency_max_s, latency_s)
+
+        self.step_duration_mean_s += (step_duration_s - self.step_duration_mean_s)/self.steps
+        self.step_duration_max_s = max(self.step_duration_max_s, step_duration_s)
+
+    def jitter_s(self):
+        if self.steps < 2:
+            return 0
+        return math.sqrt(self.latency_m2/(self.steps - 1))
+
+    def as_dict(self):
+        return {
+            "steps": self.steps,
+            "missed_deadlines": self.missed_deadlines,
+            "skipped_steps": self.skipped_steps,
+            "resyncs": self.resyncs,
+            "latency_min_s": self.latency_min_s if self.steps else 0,
+            "latency_max_s": self.latency_max_s,
+            "latency_mean_s": self.latency_mean_s,
+            "jitter_s": self.jitter_s(),
+            "step_duration_mean_s": self.step_duration_mean_s,
+            "step_duration_max_s": self.step_duration_max_s,
+        }
+
+
+class PacedRunner:
+    # Runs RefrigerationSystem.simulate() on a fixed wall-clock period.
+    # speed is the real time multiple: a 60 s step at speed 60 runs every second.
+    #
+    # Overrun policies, when a step starts after the next deadline:
+    #   CATCH_UP: run the missed steps back to back at the normal time step,
+    #             up to max_catch_up periods behind, then resync to the clock.
+    #   SKIP:     run one normal step and drop the missed periods, counted in
+    #             skipped_steps, so the simulated time falls behind the wall
+    #             clock instead of the scheduler falling behind.
+
+    def __init__(self, simulator, time_step_s, speed=1.0, overrun_policy="CATCH_UP", max_catch_up=10, name=None):
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Invalid overrun policy: {overrun_policy}")
+        if time_step_s <= 0 or speed <= 0:
+            raise ValueError("time_step_s and speed must be positive")
+
+        self.simulator = simulator
+        self.time_step_s = time_step_s
+        self.speed = speed
+        self.period_s = time_step_s/speed
+        self.overrun_policy = overrun_policy
+        self.max_catch_up = max_catch_up
+        self.name = name if name is not None else simulator.system_type
+
+        self.stats = PacingStats()
+        self.exchange = StateExchange()
+        self.sim_time_s = 0
+        self.deadline = None
+
+        self.inputs_lock = threading.Lock()
+        self.pending_inputs = {}
+
+        self.exchange.publish(self.snapshot())
+
+    def write_inputs(self, **inputs):
+        for key in inputs:
+            if key not in INPUT_KEYS:
+                raise ValueError(f"Invalid input: {key}")
+        with self.inputs_lock:
+            self.pending_inputs.update(inputs)
+
+    def read_state(self):
+        return self.exchange.read()
+
+    def apply_inputs(self):
+        with self.inputs_lock:
+            inputs = self.pending_inputs
+            self.pending_inputs = {}
+
+        for key, value in inputs.items():
+            if key == "ambient":
+                self.simulator.temperature["ambient"] = value
+            else:
+                setattr(self.simulator, key, value)
+
+    def snapshot(self):
+        state = {}
+        state["sim_time_s"] = self.sim_time_s
+        state["step"] = self.stats.steps
+        for key, value in self.simulator.temperature.items():
+            state["t_" + key] = value
+        state["compressor_speed"] = self.simulator.compressor_speed
+        state["power"] = self.simulator.power["compressor"]
+        state["capacity"] = self.simulator.capacity["compressor"]
+        state["damper_action"] = self.simulator.damper_action
+        state["cabinet_1_door_is_open"] = self.simulator.cabinet_1_door_is_open
+        state["cabinet_2_door_is_open"] = self.simulator.cabinet_2_door_is_open
+        state["voltage_fault_state"] = self.simulator.voltage_fault_state
+        return state
+
+    def start(self, now):
+        self.deadline = now + self.period_s
+        return self.deadline
+
+    def tick(self, now):
+        # Called by the scheduler once the deadline has passed; returns the next one
+        latency_s = now - self.deadline
+        periods_late = int(latency_s // self.period_s)
+        if periods_late > 0:
+            self.stats.missed_deadlines += 1
+
+        if periods_late > 0 and self.overrun_policy == "SKIP":
+            self.stats.skipped_steps += periods_late
+            self.deadline += self.period_s*periods_late
+
+        self.apply_inputs()
+        self.simulator.simulate(self.time_step_s)
+        self.sim_time_s += self.time_step_s
+        step_duration_s = time.monotonic() - now
+
+        self.stats.record(latency_s, step_duration_s)
+        self.exchange.publish(self.snapshot())
+
+        self.deadline += self.period_s
+        if self.overrun_policy == "CATCH_UP" and periods_late > self.max_catch_up:
+            self.stats.resyncs += 1
+            self.stats.skipped_steps += periods_late
+            self.deadline = now + self.period_s
+        return self.deadline
+
+
+class PacingScheduler:
+    # Earliest deadline first over any number of runners on one thread. A
+    # runner catching up re-enters the queue behind every runner whose
+    # deadline is earlier, so one late plant cannot starve the others.
+
+    def __init__(self, runners=()):
+        self.queue = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = None
+        # Runner stepping outside the lock, and runners removed meanwhile
+        self.in_flight = None
+        self.removed = set()
+        for runner in runners:
+            self.add(runner)
+
+    def add(self, runner):
+        with self.condition:
+            if runner is self.in_flight:
+                if runner not in self.removed:
+                    raise ValueError(f"Runner already scheduled: {runner.name}")
+                # Removed while stepping: keep it, it is queued again once its tick ends
+                self.removed.discard(runner)
+                return
+            if any(entry[2] is runner for entry in self.queue):
+                raise ValueError(f"Runner already scheduled: {runner.name}")
+            deadline = runner.start(time.monotonic())
+            heapq.heappush(self.queue, (deadline, next(self.order), runner))
+            self.condition.notify()
+
+    def remove(self, runner):
+        with self.condition:
+            self.queue = [entry for entry in self.queue if entry[2] is not runner]
+            heapq.heapify(self.queue)
+            if runner is self.in_flight:
+                self.removed.add(runner)
+            self.condition.notify()
+
+    def runners(self):
+        with self.condition:
+            runners = [entry[2] for entry in self.queue]
+            if self.in_flight is not None and self.in_flight not in self.removed:
+                runners.append(self.in_flight)
+            return runners
+
+    def run(self, duration_s=None):
+        self.stopped = False
+        self.loop(duration_s)
+
+    def loop(self, duration_s):
+        # stopped is reset by run() or start(), never here, so a stop()
+        # issued right after start() cannot be lost
+        end = None if duration_s is None else time.monotonic() + duration_s
+        while True:
+            with self.condition:
+                while not self.stopped:
+                    now = time.monotonic()
+                    if end is not None and now >= end:
+                        self.stopped = True
+                        break
+                    if self.queue and self.queue[0][0] <= now:
+                        break
+                    timeout = None if not self.queue else self.queue[0][0] - now
+                    if end is not None:
+                        timeout = end - now if timeout is None else min(timeout, end - now)
+                    self.condition.wait(timeout)
+                if self.stopped:
+                    return
+                deadline, order, runner = heapq.heappop(self.queue)
+                self.in_flight = runner
+
+            # Step outside the lock so add/remove/stop never wait on physics
+            next_deadline = runner.tick(time.monotonic())
+
+            with self.condition:
+                self.in_flight = None
+                if runner in self.removed:
+                    self.removed.discard(runner)
+                else:
+                    heapq.heappush(self.queue, (next_deadline, next(self.order), runner))
+
+    def start(self, duration_s=None):
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, args=(duration_s,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Real-time paced refrigeration plant')
+
+    parser.add_argument('--system', choices=list(SYSTEM_CONFIGS.keys()), required=True)
+    parser.add_argument('--control', choices=['ON_OFF', 'VCC'], required=True)
+    parser.add_argument('--speed', type=float, default=1.0, help='Multiple of real time')
+    parser.add_argument('--time_step', type=float, default=SECONDS_PER_MINUTE, help='Simulation time step in seconds')
+    parser.add_argument('--policy', choices=OVERRUN_POLICIES, default="CATCH_UP")
+    parser.add_argument('--duration', type=float, default=10, help='Wall clock duration in seconds')
+
+    args = vars(parser.parse_args())
+
+    simulator = RefrigerationSystem(args['system'], args['control'])
+    runner = PacedRunner(simulator, args['time_step'], args['speed'], args['policy'])
+
+    scheduler = PacingScheduler([runner])
+    scheduler.start(args['duration'])
+    scheduler.thread.join()
+
+    state = runner.read_state()
+    print(f"Simulated {state['sim_time_s']/SECONDS_PER_MINUTE:.0f} min, cabinet_1 {state['t_cabinet_1']:.2f} C")
+    for key, value in runner.stats.as_dict().items():
+        print(f"{key}: {value}")
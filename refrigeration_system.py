@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import argparse
+from decimation import LodPlot
 
 DELTA_AMBIENT_CONDENSER = 10
 DELTA_CABINET_EVAP = 10
@@ -281,6 +282,10 @@ class RefrigerationSystem:
         self.p=0
         self.i=0
 
+        #Heat exchanger approach temperatures
+        self.delta_ambient_condenser = DELTA_AMBIENT_CONDENSER
+        self.delta_cabinet_evap = DELTA_CABINET_EVAP
+
         #Initial state
         self.temperature = {}
         self.temperature["ambient"] = 25
@@ -288,8 +293,8 @@ class RefrigerationSystem:
         self.temperature["cabinet_2"] = self.sys_config["setpoint_2"] + self.sys_config["hysteresis_2"]
         self.temperature["food_1"] = self.temperature["cabinet_1"]
         self.temperature["food_2"] = self.temperature["cabinet_2"]
-        self.temperature["cond"] = self.temperature["ambient"] + DELTA_AMBIENT_CONDENSER
-        self.temperature["evap"] = self.temperature["cabinet_1"] - DELTA_CABINET_EVAP
+        self.temperature["cond"] = self.temperature["ambient"] + self.delta_ambient_condenser
+        self.temperature["evap"] = self.temperature["cabinet_1"] - self.delta_cabinet_evap
         
         self.voltage_fault_state = False
         self.voltage_fault_duration_s = 0
@@ -491,9 +496,9 @@ class RefrigerationSystem:
         #Apply timestep
         for key in self.temperature:
             if(key == "cond"):
-                self.temperature[key] = self.temperature["ambient"] + DELTA_AMBIENT_CONDENSER
+                self.temperature[key] = self.temperature["ambient"] + self.delta_ambient_condenser
             elif(key == "evap"):
-                self.temperature[key] = self.temperature["cabinet_1"] - DELTA_CABINET_EVAP
+                self.temperature[key] = self.temperature["cabinet_1"] - self.delta_cabinet_evap
             elif(self.sys_config["mass"][key] != 0):
                 self.temperature[key] += delta_energy[key]/(self.sys_config["mass"][key] * self.specific_heat[key])
 
@@ -604,20 +609,22 @@ if __name__ == "__main__":
 
 
     # Plotting the results
-    plt.figure(figsize=(10, 6))
-    plt.plot(t_ambient, label='Ambient')
-    plt.plot(t_cabinet_1, label='Cabinet 1')
-    plt.plot(t_food_1, label='Food 1')
+    fig, ax = plt.subplots(figsize=(10, 6))
+    lod = LodPlot(ax)
+    lod.plot(t_ambient, label='Ambient')
+    lod.plot(t_cabinet_1, label='Cabinet 1')
+    lod.plot(t_food_1, label='Food 1')
     if(system == "house_refrigerator"):
-        plt.plot(t_cabinet_2, label='Cabinet 2')
-        plt.plot(t_food_2, label='Food 2')
-    plt.plot(t_speed, label='Speed/100')
-    plt.plot(t_power, label='Power/100')
-    plt.plot(t_capacity, label='Capacity/100')
-    plt.plot(t_reference, label='Reference')
+        lod.plot(t_cabinet_2, label='Cabinet 2')
+        lod.plot(t_food_2, label='Food 2')
+    lod.plot(t_speed, switching=True, label='Speed/100')
+    lod.plot(t_power, switching=True, label='Power/100')
+    lod.plot(t_capacity, switching=True, label='Capacity/100')
+    lod.plot(t_reference, label='Reference')
     if(control == "VCC"):
-        plt.plot(t_p, label='p_component/100')
-        plt.plot(t_i, label='i_component/100')
+        lod.plot(t_p, switching=True, label='p_component/100')
+        lod.plot(t_i, switching=True, label='i_component/100')
+    lod.follow()
     plt.title('Simulation of Refrigeration System')
     plt.xlabel('Minutes')
     plt.ylabel('Value')
@@ -0,0 +1,409 @@
+import argparse
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from refrigeration_system import RefrigerationSystem, SYSTEM_CONFIGS, SECONDS_PER_MINUTE, MINUTES_PER_HOUR, HOURS_PER_DAY
+
+SECONDS_PER_DAY = SECONDS_PER_MINUTE * MINUTES_PER_HOUR * HOURS_PER_DAY
+
+METHODS = ["OAT", "MORRIS", "SOBOL"]
+
+KPIS = ["energy_kwh_day", "food_1_excursion_Kh", "food_1_recovery_h"]
+
+# Disturbance scenario applied to every run, as (hours from the start of the
+# run, input, value). Without it the warm-started system stays at steady state
+# and the food never leaves its band. The warm food load keeps the run's own
+# food mass, so "mass.food_1" is still perturbed.
+DISTURBANCES = [
+    (1, "cabinet_1_door_is_open", True),
+    (1.5, "cabinet_1_door_is_open", False),
+    (2, "food_1", 25),
+]
+
+DEFAULT_PARAMETERS = [
+    "ambient",
+    "Kp",
+    "Ki",
+    "stab_time",
+    "hysteresis_1",
+    "mass.cabinet_1",
+    "mass.food_1",
+    "DELTA_AMBIENT_CONDENSER",
+    "DELTA_CABINET_EVAP",
+    "power_base",
+    "cap_base",
+]
+
+# Controller parameters only used by VCC control
+VCC_PARAMETERS = ["Kp", "Ki", "stab_time"]
+
+# Parameters stored as attributes of RefrigerationSystem
+ATTRIBUTE_PARAMETERS = {
+    "DELTA_AMBIENT_CONDENSER": "delta_ambient_condenser",
+    "DELTA_CABINET_EVAP": "delta_cabinet_evap",
+}
+
+
+# Parameter names:
+#   "ambient"                     ambient temperature
+#   "mass.<body>"                 thermal mass in sys_config["mass"]
+#   "DELTA_*"                     heat exchanger approach temperatures
+#   compressor coefficient keys   e.g. "power_Tc", "cap_base"
+#   any other sys_config key      e.g. "Kp", "Ki", "stab_time", "hysteresis_1"
+def get_parameter(simulator, name):
+    if name == "ambient":
+        return simulator.temperature["ambient"]
+    if name.startswith("mass."):
+        return simulator.sys_config["mass"][name[len("mass."):]]
+    if name in ATTRIBUTE_PARAMETERS:
+        return getattr(simulator, ATTRIBUTE_PARAMETERS[name])
+    if name in simulator.comp_param:
+        return simulator.comp_param[name]
+    if name in simulator.sys_config and not isinstance(simulator.sys_config[name], (dict, str)):
+        return simulator.sys_config[name]
+    raise ValueError(f"Invalid parameter: {name}")
+
+
+def set_parameter(simulator, name, value):
+    get_parameter(simulator, name)
+    if name == "ambient":
+        simulator.temperature["ambient"] = value
+    elif name.startswith("mass."):
+        simulator.sys_config["mass"][name[len("mass."):]] = value
+    elif name in ATTRIBUTE_PARAMETERS:
+        setattr(simulator, ATTRIBUTE_PARAMETERS[name], value)
+    elif name in simulator.comp_param:
+        simulator.comp_param[name] = value
+    else:
+        simulator.sys_config[name] = value
+
+
+class Parameter:
+
+    def __init__(self, name, low, high):
+        if not high > low:
+            raise ValueError(f"Empty range for parameter {name}: [{low}, {high}]")
+        self.name = name
+        self.low = low
+        self.high = high
+
+    def scale(self, unit):
+        return self.low + unit*(self.high - self.low)
+
+
+def default_parameter_names(control_type):
+    if control_type == "VCC":
+        return list(DEFAULT_PARAMETERS)
+    return [name for name in DEFAULT_PARAMETERS if name not in VCC_PARAMETERS]
+
+
+def default_parameters(simulator, names, span=0.2):
+    # Nominal value +/- span, relative
+    parameters = []
+    for name in names:
+        nominal = get_parameter(simulator, name)
+        if nominal == 0:
+            raise ValueError(f"Parameter {name} is zero, give an explicit range")
+        low, high = sorted((nominal*(1 - span), nominal*(1 + span)))
+        parameters.append(Parameter(name, low, high))
+    return parameters
+
+
+def warm_start(system_type, control_type, warmup_s, time_step_s):
+    simulator = RefrigerationSystem(system_type, control_type)
+    # Private copies, so perturbed runs never touch the shared configs
+    simulator.sys_config = copy.deepcopy(simulator.sys_config)
+    simulator.comp_param = dict(simulator.comp_param)
+    for i in range(int(warmup_s / time_step_s)):
+        simulator.simulate(time_step_s)
+    return simulator
+
+
+def apply_disturbance(simulator, key, value):
+    if key == "food_1":
+        simulator.temperature["food_1"] = value
+    else:
+        setattr(simulator, key, value)
+
+
+def evaluate(simulator, names, rows, horizon_s, time_step_s, disturbances=DISTURBANCES):
+    # KPIs for every row of parameter values, each run starting from the warm state
+    # and going through the disturbances.
+    # The excursion threshold is the nominal one, so it does not move with hysteresis_1.
+    # Recovery is the time from the last food load until food_1 is back under the
+    # threshold, or until the end of the run if it never is.
+    threshold = simulator.sys_config["setpoint_1"] + simulator.sys_config["hysteresis_1"]
+    num_steps = int(horizon_s / time_step_s)
+    events = {}
+    for hours, key, value in disturbances:
+        events.setdefault(int(round(hours * SECONDS_PER_MINUTE * MINUTES_PER_HOUR / time_step_s)), []).append((key, value))
+    outputs = np.zeros((len(rows), len(KPIS)))
+
+    for row, values in enumerate(rows):
+        run = copy.deepcopy(simulator)
+        for name, value in zip(names, values):
+            set_parameter(run, name, value)
+
+        energy_j = 0
+        excursion_ks = 0
+        load_step = None
+        recovery_s = 0
+        for i in range(num_steps):
+            for key, value in events.get(i, []):
+                apply_disturbance(run, key, value)
+                if key == "food_1":
+                    load_step = i
+                    recovery_s = None
+            run.simulate(time_step_s)
+            energy_j += run.power["compressor"] * time_step_s
+            excursion_ks += max(run.temperature["food_1"] - threshold, 0) * time_step_s
+            if recovery_s is None and run.temperature["food_1"] <= threshold:
+                recovery_s = (i + 1 - load_step) * time_step_s
+        if recovery_s is None:
+            recovery_s = (num_steps - load_step) * time_step_s
+
+        outputs[row] = [energy_j/3.6e6/(horizon_s/SECONDS_PER_DAY), excursion_ks/3600, recovery_s/3600]
+
+    return outputs
+
+
+def bootstrap(estimator, samples, rng, resamples=500, confidence=0.95):
+    # Percentile interval of estimator(indices) over resampled rows
+    estimates = np.array([estimator(rng.integers(0, samples, samples)) for i in range(resamples)])
+    alpha = (1 - confidence)/2
+    return np.quantile(estimates, alpha, axis=0), np.quantile(estimates, 1 - alpha, axis=0)
+
+
+class SensitivityResult:
+
+    def __init__(self, method, names, runs):
+        self.method = method
+        self.names = names
+        self.runs = runs
+        # indices[kpi][index_name] = (value, ci_low, ci_high), arrays over parameters
+        self.indices = {kpi: {} for kpi in KPIS}
+        self.primary = None
+        # Variance of each KPI over the design, a KPI without any is not ranked
+        self.variance = np.zeros(len(KPIS))
+
+    def add(self, kpi, index_name, value, ci_low, ci_high):
+        self.indices[kpi][index_name] = (np.asarray(value), np.asarray(ci_low), np.asarray(ci_high))
+
+    def ranking(self, kpi):
+        value, ci_low, ci_high = self.indices[kpi][self.primary]
+        order = np.argsort(-np.abs(value), kind="stable")
+        return [(self.names[i], value[i], ci_low[i], ci_high[i]) for i in order]
+
+    def report(self):
+        lines = [f"{self.method} sensitivity, {self.runs} simulations"]
+        for j, kpi in enumerate(KPIS):
+            lines.append("")
+            if self.variance[j] == 0:
+                lines.append(f"{kpi}: zero variance over the design, not ranked")
+                continue
+            lines.append(f"{kpi} (ranked by {self.primary})")
+            index_names = list(self.indices[kpi])
+            lines.append(f"  {'parameter':<26}" + "".join(f"{name:>34}" for name in index_names))
+            for name, value, ci_low, ci_high in self.ranking(kpi):
+                i = self.names.index(name)
+                cells = []
+                for index_name in index_names:
+                    v, lo, hi = (array[i] for array in self.indices[kpi][index_name])
+                    cells.append(f"{v:>12.4g} [{lo:>9.3g}, {hi:>9.3g}]")
+                lines.append(f"  {name:<26}" + "".join(f"{cell:>34}" for cell in cells))
+        return "\n".join(lines)
+
+
+class SensitivityAnalysis:
+    # Perturbation designs are drawn in the unit hypercube and scaled to the
+    # parameter ranges. All runs start from one warm-start state of the
+    # nominal system and identical design points are simulated only once.
+    #
+    #   OAT:    low/high of each parameter around the centre, 2k+1 runs.
+    #           Indices: the larger of the low and high half effects from the
+    #           centre, which ranks non monotone parameters too, the full-range
+    #           effect and both half effects. No confidence interval (deterministic).
+    #   MORRIS: r trajectories of k+1 runs, each point shared by two
+    #           elementary effects. Indices: mu_star and sigma.
+    #   SOBOL:  Saltelli design, matrices A and B reused by every index,
+    #           N*(k+2) runs. Indices: first order S1 and total ST.
+    # Confidence intervals of MORRIS and SOBOL are bootstrapped.
+
+    def __init__(self, system_type, control_type, parameters, horizon_days=2, warmup_days=2,
+                 time_step_s=SECONDS_PER_MINUTE, workers=1, seed=0, disturbances=DISTURBANCES):
+        self.parameters = parameters
+        self.names = [parameter.name for parameter in parameters]
+        self.horizon_s = horizon_days * SECONDS_PER_DAY
+        self.time_step_s = time_step_s
+        self.disturbances = disturbances
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+
+        self.simulator = warm_start(system_type, control_type, warmup_days * SECONDS_PER_DAY, time_step_s)
+        for name in self.names:
+            get_parameter(self.simulator, name)
+
+        self.cache = {}
+
+    def evaluate_design(self, unit_rows):
+        values = np.array([[parameter.scale(u) for parameter, u in zip(self.parameters, row)]
+                           for row in unit_rows])
+        keys = [tuple(row) for row in values]
+        missing = list(dict.fromkeys(key for key in keys if key not in self.cache))
+
+        if missing:
+            if self.workers > 1:
+                chunks = [missing[i::self.workers*4] for i in range(min(len(missing), self.workers*4))]
+                with ProcessPoolExecutor(self.workers) as executor:
+                    futures = [executor.submit(evaluate, self.simulator, self.names, chunk, self.horizon_s,
+                                               self.time_step_s, self.disturbances)
+                               for chunk in chunks]
+                    for chunk, future in zip(chunks, futures):
+                        for key, output in zip(chunk, future.result()):
+                            self.cache[key] = output
+            else:
+                for key, output in zip(missing, evaluate(self.simulator, self.names, missing, self.horizon_s,
+                                                            self.time_step_s, self.disturbances)):
+                    self.cache[key] = output
+
+        return np.array([self.cache[key] for key in keys]), len(missing)
+
+    def run(self, method, samples=None, levels=4):
+        if method == "OAT":
+            return self.run_oat()
+        elif method == "MORRIS":
+            return self.run_morris(samples if samples is not None else 10, levels)
+        elif method == "SOBOL":
+            return self.run_sobol(samples if samples is not None else 64)
+        raise ValueError(f"Invalid method: {method}")
+
+    def run_oat(self):
+        k = len(self.parameters)
+        rows = np.full((2*k + 1, k), 0.5)
+        for i in range(k):
+            rows[1 + 2*i, i] = 0
+            rows[2 + 2*i, i] = 1
+        outputs, runs = self.evaluate_design(rows)
+
+        result = SensitivityResult("OAT", self.names, runs)
+        result.variance = outputs.var(axis=0)
+        result.primary = "max_half"
+        centre = outputs[0]
+        low_effects = centre - outputs[1::2]
+        high_effects = outputs[2::2] - centre
+        effects = low_effects + high_effects
+        max_half = np.maximum(np.abs(low_effects), np.abs(high_effects))
+        nan = np.full(k, np.nan)
+        for j, kpi in enumerate(KPIS):
+            result.add(kpi, "max_half", max_half[:, j], nan, nan)
+            result.add(kpi, "effect", effects[:, j], nan, nan)
+            result.add(kpi, "low_half", low_effects[:, j], nan, nan)
+            result.add(kpi, "high_half", high_effects[:, j], nan, nan)
+        return result
+
+    def run_morris(self, trajectories, levels):
+        k = len(self.parameters)
+        delta = levels/(2*(levels - 1))
+        grid = np.arange(levels)/(levels - 1)
+        grid = grid[grid + delta <= 1 + 1e-12]
+
+        rows = np.zeros((trajectories, k + 1, k))
+        orders = np.zeros((trajectories, k), dtype=int)
+        for t in range(trajectories):
+            point = self.rng.choice(grid, k)
+            orders[t] = self.rng.permutation(k)
+            rows[t, 0] = point
+            for step, i in enumerate(orders[t]):
+                point = point.copy()
+                point[i] += delta
+                rows[t, step + 1] = point
+        outputs, runs = self.evaluate_design(rows.reshape(-1, k))
+        outputs = outputs.reshape(trajectories, k + 1, len(KPIS))
+
+        # effects[t, i, kpi], elementary effect of parameter i along trajectory t
+        effects = np.zeros((trajectories, k, len(KPIS)))
+        for t in range(trajectories):
+            steps = (outputs[t, 1:] - outputs[t, :-1])/delta
+            effects[t, orders[t]] = steps
+
+        result = SensitivityResult("MORRIS", self.names, runs)
+        result.variance = outputs.reshape(-1, len(KPIS)).var(axis=0)
+        result.primary = "mu_star"
+        mu_star_low, mu_star_high = bootstrap(lambda s: np.abs(effects[s]).mean(axis=0), trajectories, self.rng)
+        sigma_low, sigma_high = bootstrap(lambda s: effects[s].std(axis=0), trajectories, self.rng)
+        mu_star = np.abs(effects).mean(axis=0)
+        sigma = effects.std(axis=0)
+        for j, kpi in enumerate(KPIS):
+            result.add(kpi, "mu_star", mu_star[:, j], mu_star_low[:, j], mu_star_high[:, j])
+            result.add(kpi, "sigma", sigma[:, j], sigma_low[:, j], sigma_high[:, j])
+        return result
+
+    def run_sobol(self, samples):
+        k = len(self.parameters)
+        a = self.rng.random((samples, k))
+        b = self.rng.random((samples, k))
+        ab = np.repeat(a[None], k, axis=0)
+        for i in range(k):
+            ab[i, :, i] = b[:, i]
+        outputs, runs = self.evaluate_design(np.concatenate([a, b, ab.reshape(-1, k)]))
+        f_a = outputs[:samples]
+        f_b = outputs[samples:2*samples]
+        f_ab = outputs[2*samples:].reshape(k, samples, len(KPIS))
+
+        # Saltelli (2010) first order and Jansen total effect estimators.
+        # f_b is centred, which keeps S1 unbiased but much less noisy for
+        # KPIs with a large mean, such as temperatures.
+        def first_order(s):
+            both = np.concatenate([f_a[s], f_b[s]])
+            variance = both.var(axis=0)
+            centred = f_b[s] - both.mean(axis=0)
+            return (centred * (f_ab[:, s] - f_a[s])).mean(axis=1) / np.where(variance > 0, variance, np.nan)
+
+        def total(s):
+            variance = np.concatenate([f_a[s], f_b[s]]).var(axis=0)
+            return 0.5*((f_a[s] - f_ab[:, s])**2).mean(axis=1) / np.where(variance > 0, variance, np.nan)
+
+        every = np.arange(samples)
+        result = SensitivityResult("SOBOL", self.names, runs)
+        result.variance = outputs.var(axis=0)
+        result.primary = "ST"
+        s1_low, s1_high = bootstrap(first_order, samples, self.rng)
+        st_low, st_high = bootstrap(total, samples, self.rng)
+        s1 = first_order(every)
+        st = total(every)
+        for j, kpi in enumerate(KPIS):
+            result.add(kpi, "S1", s1[:, j], s1_low[:, j], s1_high[:, j])
+            result.add(kpi, "ST", st[:, j], st_low[:, j], st_high[:, j])
+        return result
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Sensitivity of energy and food temperature KPIs to model parameters')
+
+    parser.add_argument('--system', choices=list(SYSTEM_CONFIGS.keys()), required=True)
+    parser.add_argument('--control', choices=['ON_OFF', 'VCC'], required=True)
+    parser.add_argument('--method', choices=METHODS, default="MORRIS")
+    parser.add_argument('--parameters', nargs='+', default=None,
+                        help='Defaults to DEFAULT_PARAMETERS, without VCC_PARAMETERS under ON_OFF control')
+    parser.add_argument('--span', type=float, default=0.2, help='Relative range around the nominal value')
+    parser.add_argument('--samples', type=int, default=None, help='Morris trajectories or Sobol base samples')
+    parser.add_argument('--horizon_days', type=float, default=2)
+    parser.add_argument('--warmup_days', type=float, default=2)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = vars(parser.parse_args())
+
+    nominal = RefrigerationSystem(args['system'], args['control'])
+    names = args['parameters'] if args['parameters'] is not None else default_parameter_names(args['control'])
+    parameters = default_parameters(nominal, names, args['span'])
+
+    analysis = SensitivityAnalysis(args['system'], args['control'], parameters,
+                                   horizon_days=args['horizon_days'], warmup_days=args['warmup_days'],
+                                   workers=args['workers'], seed=args['seed'])
+    result = analysis.run(args['method'], samples=args['samples'])
+    print(result.report())
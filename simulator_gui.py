@@ -1,11 +1,22 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import tkinter as tk
 from tkinter import ttk
 import argparse
 from matplotlib.animation import FuncAnimation
 from refrigeration_system import RefrigerationSystem, SYSTEM_CONFIGS
+from decimation import LodPlot, TracePyramid
+
+
+class LiveNavigationToolbar(NavigationToolbar2Tk):
+    def __init__(self, canvas, window, on_home):
+        self.on_home = on_home
+        super().__init__(canvas, window, pack_toolbar=False)
+
+    def home(self, *args):
+        super().home(*args)
+        self.on_home()
 
 
 class RefrigerationSimulatorGUI:
@@ -21,7 +32,7 @@ class RefrigerationSimulatorGUI:
         
         self.simulator = RefrigerationSystem(self.system_type.get(), self.control_type.get())
         self.time = 0
-        self.data = {"time": [], "cabinet_1": [], "cabinet_2": [], "ambient": []}
+        self.create_traces()
         
         self.animation = FuncAnimation(self.fig, self.update_plot, interval=100, blit=False)
 
@@ -51,6 +62,31 @@ class RefrigerationSimulatorGUI:
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.master)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.toolbar = LiveNavigationToolbar(self.canvas, self.master, self.resume_following)
+        self.toolbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.canvas.mpl_connect("button_press_event", self.on_press)
+        self.canvas.mpl_connect("button_release_event", self.on_release)
+        
+        # The view tracks the newest samples until the user pans or zooms away
+        self.following = True
+        self.view_changed = False
+        
+        self.ax.set_xlabel("Time (minutes)")
+        self.ax.set_ylabel("Temperature (°C)")
+        self.ax.set_title("Refrigeration System Simulation")
+
+    def create_traces(self):
+        for line in list(self.ax.lines):
+            line.remove()
+        if hasattr(self, "lod"):
+            self.ax.callbacks.disconnect(self.lod.callback_id)
+        
+        self.lod = LodPlot(self.ax)
+        self.data = {}
+        for key, label in [("cabinet_1", "Cabinet 1"), ("cabinet_2", "Cabinet 2"), ("ambient", "Ambient")]:
+            self.data[key] = self.lod.plot(TracePyramid(x0=1), label=label)
+        self.ax.legend()
 
     def set_ambient_temp(self):
         try:
@@ -59,29 +95,44 @@ class RefrigerationSimulatorGUI:
         except ValueError:
             print("Invalid temperature value")
 
+    def resume_following(self):
+        self.following = True
+        self.view_changed = False
+
+    def on_press(self, event):
+        # Stop following during a pan drag or zoom rectangle, so a frame does
+        # not reset the limits under the user
+        if self.toolbar.mode:
+            self.following = False
+
+    def on_release(self, event):
+        # Whether to follow again is decided on the next frame, from the
+        # limits the pan/zoom left
+        if self.toolbar.mode:
+            self.view_changed = True
+
     def restart_simulation(self):
         self.simulator = RefrigerationSystem(self.system_type.get(), self.control_type.get())
         self.time = 0
-        self.data = {"time": [], "cabinet_1": [], "cabinet_2": [], "ambient": []}
+        self.create_traces()
+        self.resume_following()
 
     def update_plot(self, frame):
         self.simulator.simulate(60)  # Simulate for 1 minute
         self.time += 1
         
-        self.data["time"].append(self.time)
-        self.data["cabinet_1"].append(self.simulator.temperature["cabinet_1"])
-        self.data["cabinet_2"].append(self.simulator.temperature["cabinet_2"])
-        self.data["ambient"].append(self.simulator.temperature["ambient"])
+        # Follow again if the user panned or zoomed onto the newest sample
+        if self.view_changed:
+            self.view_changed = False
+            self.following = self.ax.get_xlim()[1] >= self.time - 1
         
-        self.ax.clear()
-        self.ax.plot(self.data["time"], self.data["cabinet_1"], label="Cabinet 1")
-        self.ax.plot(self.data["time"], self.data["cabinet_2"], label="Cabinet 2")
-        self.ax.plot(self.data["time"], self.data["ambient"], label="Ambient")
+        for key in self.data:
+            self.data[key].append([self.simulator.temperature[key]])
         
-        self.ax.set_xlabel("Time (minutes)")
-        self.ax.set_ylabel("Temperature (°C)")
-        self.ax.set_title("Refrigeration System Simulation")
-        self.ax.legend()
+        if self.following:
+            self.lod.follow()
+        else:
+            self.lod.refresh()
         
         self.canvas.draw()
 
@@ -0,0 +1,66 @@
+import numpy as np
+
+from decimation import TracePyramid
+
+
+def cycling_trace(size, period, on):
+    # On/off trace with an edge pair every period/2 samples on average
+    return np.where(np.arange(size) % period < on, 36.0, 0.0)
+
+
+def test_edges_survive_at_coarsest_level():
+    values = cycling_trace(20000, 1000, 500)
+    pyramid = TracePyramid(values, switching=True, min_bucket=1000, factor=100)
+    assert pyramid.select_level(len(values), 60) is pyramid.levels[-1]
+
+    x, y = pyramid.window(0, len(values), 60)
+    kept = set(x.astype(int))
+    changes = np.flatnonzero(np.diff(values != 0)) + 1
+    for change in changes:
+        assert change - 1 in kept and change in kept
+
+
+def test_edges_limited_to_one_per_column():
+    values = cycling_trace(500000, 20, 7)
+    pyramid = TracePyramid(values, switching=True)
+    x, y = pyramid.window(0, len(values), 2000)
+    assert len(x) <= 3*2000
+
+
+def test_window_keeps_min_and_max():
+    values = np.cumsum(np.random.default_rng(0).normal(size=100000))
+    pyramid = TracePyramid(values)
+    for x_min, x_max in [(0, 99999), (12345, 67890), (500, 600)]:
+        x, y = pyramid.window(x_min, x_max, 500)
+        raw = values[int(x[0]):int(x[-1]) + 1]
+        assert x[0] <= x_min and x[-1] >= x_max
+        assert y.min() == raw.min() and y.max() == raw.max()
+
+
+def test_incremental_append_matches_batch():
+    values = cycling_trace(50000, 37, 11) + np.random.default_rng(1).random(50000)*(cycling_trace(50000, 37, 11) > 0)
+    batch = TracePyramid(values, switching=True)
+    incremental = TracePyramid(switching=True)
+    for chunk in np.array_split(values, 97):
+        incremental.append(chunk)
+
+    assert np.array_equal(batch.edges.view(), incremental.edges.view())
+    assert len(batch.levels) == len(incremental.levels)
+    for a, b in zip(batch.levels, incremental.levels):
+        assert a.bucket == b.bucket
+        assert a.complete_buckets == b.complete_buckets
+        assert np.array_equal(a.indices.view(), b.indices.view())
+
+
+def test_empty_trace_and_window_outside_data():
+    x, y = TracePyramid().window(0, 100, 500)
+    assert len(x) == 0 and len(y) == 0
+
+    values = np.arange(1000.0)
+    pyramid = TracePyramid(values)
+    x, y = pyramid.window(5000, 6000, 500)
+    assert np.array_equal(y, values[x.astype(int)])
+    assert len(x) <= 1
+    x, y = pyramid.window(-600, -500, 500)
+    assert np.array_equal(y, values[x.astype(int)])
+    assert len(x) <= 2
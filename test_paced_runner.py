@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from paced_runner import PacedRunner, PacingScheduler, StateExchange
+from refrigeration_system import RefrigerationSystem
+
+
+class SlowSystem(RefrigerationSystem):
+
+    def __init__(self, step_duration_s):
+        super().__init__("bottle_cooler", "ON_OFF")
+        self.step_duration_s = step_duration_s
+        self.time_steps = []
+
+    def simulate(self, time_step_s):
+        time.sleep(self.step_duration_s)
+        self.time_steps.append(time_step_s)
+        super().simulate(time_step_s)
+
+
+def test_state_exchange_returns_latest_copy():
+    exchange = StateExchange()
+    exchange.publish({"a": 1})
+    exchange.publish({"a": 2})
+    snapshot = exchange.read()
+    snapshot["a"] = 3
+    assert exchange.read() == {"a": 2}
+
+
+def test_remove_while_stepping():
+    runner = PacedRunner(SlowSystem(0.05), 60, speed=6000)
+    scheduler = PacingScheduler([runner])
+    scheduler.start()
+    while runner.stats.steps == 0:
+        time.sleep(0.001)
+    while scheduler.in_flight is not runner:
+        time.sleep(0.001)
+
+    assert runner in scheduler.runners()
+    scheduler.remove(runner)
+    assert scheduler.runners() == []
+    steps = runner.stats.steps
+    time.sleep(0.2)
+    scheduler.stop()
+    assert runner.stats.steps <= steps + 1
+
+
+def test_add_while_stepping_after_remove():
+    runner = PacedRunner(SlowSystem(0.05), 60, speed=6000)
+    scheduler = PacingScheduler([runner])
+    scheduler.start()
+    while scheduler.in_flight is not runner:
+        time.sleep(0.001)
+
+    with scheduler.condition:
+        scheduler.remove(runner)
+        scheduler.add(runner)
+        assert scheduler.in_flight is runner
+        assert scheduler.runners() == [runner]
+    with pytest.raises(ValueError):
+        scheduler.add(runner)
+
+    steps = runner.stats.steps
+    time.sleep(0.2)
+    scheduler.stop()
+    assert runner.stats.steps > steps + 1
+
+
+def test_skip_drops_missed_periods():
+    simulator = SlowSystem(0)
+    runner = PacedRunner(simulator, 60, speed=60, overrun_policy="SKIP", max_catch_up=3)
+    runner.start(0)
+    now = runner.deadline + 10*runner.period_s
+    assert runner.tick(now) == now + runner.period_s
+
+    assert simulator.time_steps == [60]
+    assert runner.sim_time_s == 60
+    assert runner.stats.steps == 1
+    assert runner.stats.missed_deadlines == 1
+    assert runner.stats.skipped_steps == 10
+
+
+def test_catch_up_resyncs_when_too_late():
+    runner = PacedRunner(SlowSystem(0), 60, speed=60, overrun_policy="CATCH_UP", max_catch_up=3)
+    runner.start(0)
+
+    now = runner.deadline + 2*runner.period_s
+    assert runner.tick(now) < now
+    assert runner.stats.resyncs == 0
+
+    now = runner.deadline + 5*runner.period_s
+    assert runner.tick(now) == now + runner.period_s
+    assert runner.stats.missed_deadlines == 2
+    assert runner.stats.resyncs == 1
+    assert runner.stats.skipped_steps == 5
+
+
+def test_stop_after_start():
+    scheduler = PacingScheduler([PacedRunner(SlowSystem(0), 60, speed=60)])
+    scheduler.start()
+    stopper = threading.Thread(target=scheduler.stop)
+    stopper.start()
+    stopper.join(1)
+    assert not stopper.is_alive()
+    assert scheduler.thread is None
@@ -0,0 +1,61 @@
+import copy
+
+import numpy as np
+import pytest
+
+from refrigeration_system import SYSTEM_CONFIGS, COMPRESSOR_CONFIGS
+from sensitivity import KPIS, Parameter, SensitivityAnalysis, set_parameter, warm_start
+
+PARAMETERS = [
+    Parameter("ambient", 20, 30),
+    Parameter("mass.food_1", 8, 12),
+    Parameter("cap_base", 1000, 1500),
+]
+
+
+def short_analysis(workers=1, seed=0):
+    return SensitivityAnalysis("bottle_cooler", "VCC", PARAMETERS, horizon_days=0.25, warmup_days=0.1,
+                               workers=workers, seed=seed)
+
+
+@pytest.fixture(scope="module")
+def analysis():
+    return short_analysis()
+
+
+def test_oat_runs_and_cache(analysis):
+    k = len(PARAMETERS)
+    result = analysis.run("OAT")
+    assert result.runs == 2*k + 1
+    assert analysis.run("OAT").runs == 0
+    for kpi in KPIS:
+        assert len(result.indices[kpi]["max_half"][0]) == k
+
+
+def test_set_parameter_leaves_shared_configs():
+    system_configs = copy.deepcopy(SYSTEM_CONFIGS)
+    compressor_configs = copy.deepcopy(COMPRESSOR_CONFIGS)
+
+    simulator = warm_start("bottle_cooler", "VCC", 600, 60)
+    for name, value in [("mass.cabinet_1", 1), ("Kp", 1), ("cap_base", 1), ("DELTA_CABINET_EVAP", 1)]:
+        set_parameter(simulator, name, value)
+    short_analysis().run("OAT")
+
+    assert SYSTEM_CONFIGS == system_configs
+    assert COMPRESSOR_CONFIGS == compressor_configs
+
+
+def test_design_run_counts():
+    k = len(PARAMETERS)
+    # A single trajectory never repeats a point
+    assert short_analysis().run("MORRIS", samples=1).runs == k + 1
+    assert short_analysis().run("MORRIS", samples=3).runs <= 3*(k + 1)
+    assert short_analysis().run("SOBOL", samples=4).runs == 4*(k + 2)
+
+
+def test_workers_match_serial(analysis):
+    serial = analysis.run("OAT")
+    parallel = short_analysis(workers=2).run("OAT")
+    for kpi in KPIS:
+        for index_name in serial.indices[kpi]:
+            assert np.allclose(serial.indices[kpi][index_name][0], parallel.indices[kpi][index_name][0])